@@ -3,7 +3,10 @@ DineBot - Main Flask Application
 Lightweight restaurant chatbot for college project
 """
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import logging
+import orjson
 import os
 import sys
 
@@ -15,8 +18,31 @@ from database.db_setup import initialize_database
 from services.nlp_service import NLPService
 from services.query_service import QueryService
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (faster than the stdlib encoder)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+# Request logging (level from Config.LOG_LEVEL; WARNING silences per-query logs)
+logging.basicConfig(
+    level=Config.LOG_LEVEL,
+    format='%(asctime)s %(levelname)s [%(name)s] %(message)s'
+)
+logger = logging.getLogger('dinebot')
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
 # Enable CORS for frontend communication
@@ -80,13 +106,13 @@ def chat():
         result = query_service.handle_query(user_message)
         
         # Log query (useful for debugging)
-        print(f"[USER] {user_message}")
-        print(f"[BOT] Intent: {result['intent']} (confidence: {result['confidence']:.2f})")
+        logger.info("chat user=%r intent=%s conf=%.2f",
+                    user_message, result.intent, result.confidence)
         
-        return jsonify(result)
+        return jsonify(result.to_dict())
     
-    except Exception as e:
-        print(f"Error processing query: {e}")
+    except Exception:
+        logger.exception("Error processing query")
         return jsonify({
             'error': 'Internal server error',
             'response': 'Sorry, something went wrong. Please try again!'
@@ -100,30 +126,20 @@ def get_menu():
     Optional query params: category, vegetarian, vegan
     """
     try:
-        # Get all items
-        items = query_service.get_menu_items()
-        
-        # Apply filters if provided
+        # Read filters if provided
         category = request.args.get('category')
         vegetarian = request.args.get('vegetarian', '').lower() == 'true'
         vegan = request.args.get('vegan', '').lower() == 'true'
         
-        if category:
-            items = [item for item in items if item['category'].lower() == category.lower()]
-        
-        if vegetarian:
-            items = [item for item in items if item['is_vegetarian']]
-        
-        if vegan:
-            items = [item for item in items if item['is_vegan']]
-        
-        return jsonify({
-            'items': items,
-            'count': len(items)
-        })
+        # Serialized body is cached per filter combination; answer with
+        # 304 Not Modified when the client already has this version
+        body, etag = query_service.get_menu_json(category, vegetarian, vegan)
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
     
-    except Exception as e:
-        print(f"Error fetching menu: {e}")
+    except Exception:
+        logger.exception("Error fetching menu")
         return jsonify({'error': 'Failed to fetch menu'}), 500
 
 
@@ -141,8 +157,8 @@ def get_item(item_name):
                 'message': f"No item found with name: {item_name}"
             }), 404
     
-    except Exception as e:
-        print(f"Error fetching item: {e}")
+    except Exception:
+        logger.exception("Error fetching item")
         return jsonify({'error': 'Failed to fetch item details'}), 500
 
 
@@ -153,8 +169,8 @@ def get_restaurant_info():
         info = query_service.get_restaurant_info()
         return jsonify(info)
     
-    except Exception as e:
-        print(f"Error fetching restaurant info: {e}")
+    except Exception:
+        logger.exception("Error fetching restaurant info")
         return jsonify({'error': 'Failed to fetch restaurant info'}), 500
 
 
@@ -165,8 +181,8 @@ def get_categories():
         categories = db_manager.get_categories()
         return jsonify({'categories': categories})
     
-    except Exception as e:
-        print(f"Error fetching categories: {e}")
+    except Exception:
+        logger.exception("Error fetching categories")
         return jsonify({'error': 'Failed to fetch categories'}), 500
 
 
@@ -193,7 +209,7 @@ def internal_error(error):
 # ============= RUN APPLICATION =============
 
 if __name__ == '__main__':
-    # Run Flask development server
+    # Run Flask built-in server
     print("\n" + "=" * 50)
     print("🚀 Starting DineBot Server...")
     print("=" * 50)
@@ -202,9 +218,13 @@ if __name__ == '__main__':
     print("📋 Menu endpoint: http://localhost:5000/api/menu")
     print("=" * 50 + "\n")
     
+    # Debug mode and auto-reload only with FLASK_ENV=development;
+    # use gunicorn (see gunicorn_conf.py) for production deployments
+    development = os.environ.get('FLASK_ENV') == 'development'
+    
     app.run(
         host='0.0.0.0',  # Allow external connections
         port=5000,
-        debug=True,  # Enable debug mode for development
-        use_reloader=True  # Auto-reload on code changes
+        debug=development,  # Enable debug mode for development
+        use_reloader=development  # Auto-reload on code changes
     )
\ No newline at end of file
@@ -9,7 +9,8 @@ class Config:
     
     # Flask settings
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    DEBUG = True
+    DEBUG = os.environ.get('FLASK_ENV') == 'development'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # Use WARNING in production
     
     # Database settings
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -17,7 +18,11 @@ class Config:
     
     # NLP settings
     SPACY_MODEL = 'en_core_web_sm'  # Lightweight spaCy model
+    # Unused pipes; tagger/parser/attribute_ruler are needed for POS and noun_chunks
+    SPACY_DISABLED_PIPES = ['ner', 'lemmatizer']
     SIMILARITY_THRESHOLD = 0.65  # For fuzzy matching (0-1 scale)
+    NLP_CACHE_SIZE = 1024  # Max cached process_query results
+    NLP_CACHE_MAX_QUERY_LENGTH = 200  # Longer queries are processed but not cached
     
     # Restaurant information
     RESTAURANT_INFO = {
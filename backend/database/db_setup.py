@@ -5,14 +5,41 @@ Uses SQLite for lightweight, offline functionality
 import sqlite3
 import json
 import os
+import re
+import threading
 from pathlib import Path
 
+# Words of a search keyword, each turned into an FTS5 prefix term
+WORD_RE = re.compile(r'\w+')
+
+# Keywords per search_items_batch statement: SQLite allows 500 terms in a
+# compound SELECT, and older builds 999 bound parameters (3 per keyword)
+FTS_BATCH_SIZE = 300
+
 class DatabaseManager:
     """Manages database operations for DineBot"""
     
+    # Applied once to every new connection
+    CONNECTION_PRAGMAS = [
+        'PRAGMA journal_mode=WAL',  # Readers never block on writers
+        'PRAGMA synchronous=NORMAL',  # Safe with WAL, fewer fsyncs
+        'PRAGMA cache_size=-20000',  # ~20 MB page cache
+        'PRAGMA mmap_size=67108864',  # 64 MB memory-mapped I/O
+    ]
+    
     def __init__(self, db_path):
         """Initialize database manager with path to SQLite database"""
         self.db_path = db_path
+        self._tls = threading.local()  # One persistent connection per thread
+        
+        # In-memory menu cache (the menu is small and read-only at runtime)
+        self._items_cache = None  # All items, ordered by category and name
+        self._by_id = {}  # Row id -> item
+        self._by_name = {}  # Lowercase name -> item
+        self._by_category = {}  # Lowercase category -> items ordered by name
+        self._categories = []  # Distinct categories in display order
+        self._version = 0  # Bumped whenever the menu cache is rebuilt
+        
         self.ensure_database_exists()
     
     def ensure_database_exists(self):
@@ -22,11 +49,27 @@ class DatabaseManager:
             os.makedirs(db_dir)
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Access columns by name
+        """Get this thread's database connection, opening it on first use"""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None  # Autocommit; transactions are explicit
+            )
+            conn.row_factory = sqlite3.Row  # Access columns by name
+            for pragma in self.CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._tls.conn = conn
         return conn
     
+    def close_connection(self):
+        """Close this thread's connection (a new one opens on next use)"""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._tls.conn = None
+    
     def create_tables(self):
         """Create menu_items table if it doesn't exist"""
         conn = self.get_connection()
@@ -36,11 +79,11 @@ class DatabaseManager:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS menu_items (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                category TEXT NOT NULL,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                category TEXT NOT NULL COLLATE NOCASE,
                 price REAL NOT NULL,
                 description TEXT,
-                ingredients TEXT,  -- JSON array stored as string
+                ingredients TEXT CHECK (json_valid(ingredients)),  -- JSON array stored as string
                 is_vegetarian BOOLEAN,
                 is_vegan BOOLEAN,
                 spice_level TEXT,
@@ -55,14 +98,49 @@ class DatabaseManager:
             ON menu_items(category)
         ''')
         
-        # Create index for faster name searches
+        # Name lookups use the UNIQUE constraint's index; drop the extra name
+        # index that older databases were created with
+        cursor.execute('DROP INDEX IF EXISTS idx_name')
+        
+        # Create full-text index over name and description for search_items
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'menu_fts'")
+        fts_existed = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS menu_fts USING fts5(
+                name, description,
+                content='menu_items', content_rowid='id'
+            )
+        ''')
+        
+        # Keep the full-text index in sync with menu_items
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_name 
-            ON menu_items(name)
+            CREATE TRIGGER IF NOT EXISTS menu_items_ai AFTER INSERT ON menu_items BEGIN
+                INSERT INTO menu_fts(rowid, name, description)
+                VALUES (new.id, new.name, new.description);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS menu_items_ad AFTER DELETE ON menu_items BEGIN
+                INSERT INTO menu_fts(menu_fts, rowid, name, description)
+                VALUES ('delete', old.id, old.name, old.description);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS menu_items_au AFTER UPDATE ON menu_items BEGIN
+                INSERT INTO menu_fts(menu_fts, rowid, name, description)
+                VALUES ('delete', old.id, old.name, old.description);
+                INSERT INTO menu_fts(rowid, name, description)
+                VALUES (new.id, new.name, new.description);
+            END
         ''')
         
-        conn.commit()
-        conn.close()
+        # Index rows of databases created before the full-text table existed.
+        # The triggers keep an existing index in sync, so only a new or empty
+        # one is rebuilt (not the whole menu on every startup)
+        cursor.execute('SELECT 1 FROM menu_fts_docsize LIMIT 1')
+        if not fts_existed or cursor.fetchone() is None:
+            cursor.execute("INSERT INTO menu_fts(menu_fts) VALUES ('rebuild')")
+        
         print("✓ Database tables created successfully")
     
     def populate_sample_data(self, json_file_path):
@@ -76,7 +154,7 @@ class DatabaseManager:
         
         if count > 0:
             print(f"✓ Database already contains {count} items. Skipping data load.")
-            conn.close()
+            self._refresh_cache()
             return
         
         # Load data from JSON
@@ -84,14 +162,9 @@ class DatabaseManager:
             with open(json_file_path, 'r') as f:
                 data = json.load(f)
             
-            # Insert menu items
-            for item in data['menu_items']:
-                cursor.execute('''
-                    INSERT INTO menu_items 
-                    (name, category, price, description, ingredients, 
-                     is_vegetarian, is_vegan, spice_level, preparation_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            # Insert all menu items in one transaction (one commit, not one per row)
+            rows = [
+                (
                     item['name'],
                     item['category'],
                     item['price'],
@@ -101,9 +174,18 @@ class DatabaseManager:
                     item['is_vegan'],
                     item['spice_level'],
                     item['preparation_time']
-                ))
-            
+                )
+                for item in data['menu_items']
+            ]
+            conn.execute('BEGIN')
+            cursor.executemany('''
+                INSERT INTO menu_items 
+                (name, category, price, description, ingredients, 
+                 is_vegetarian, is_vegan, spice_level, preparation_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
             conn.commit()
+            
             print(f"✓ Successfully loaded {len(data['menu_items'])} menu items")
         
         except FileNotFoundError:
@@ -111,84 +193,177 @@ class DatabaseManager:
         except json.JSONDecodeError:
             print(f"⚠ Invalid JSON in sample data file")
         except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
             print(f"⚠ Error loading sample data: {e}")
-        finally:
-            conn.close()
+        
+        # Rebuild the cache after writing to the table
+        self._refresh_cache()
     
-    def get_all_items(self):
-        """Retrieve all menu items"""
+    def _refresh_cache(self):
+        """Load the full menu once and build the lookup dicts"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM menu_items ORDER BY category, name')
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        rows = cursor.fetchall()
+        # Read column names once instead of per row
+        cols = [d[0] for d in cursor.description]
+        items = [dict(zip(cols, row)) for row in rows]
         
-        # Parse JSON ingredients back to list
+        by_id = {}
+        by_name = {}
+        by_category = {}
+        categories = []
         for item in items:
+            # Decode stored columns to native types (once, not per request):
+            # JSON ingredients back to a list, BOOLEAN flags back to bool
             item['ingredients'] = json.loads(item['ingredients'])
+            item['is_vegetarian'] = bool(item['is_vegetarian'])
+            item['is_vegan'] = bool(item['is_vegan'])
+            by_id[item['id']] = item
+            by_name[item['name'].lower()] = item
+            category_key = item['category'].lower()
+            if category_key not in by_category:
+                by_category[category_key] = []
+            by_category[category_key].append(item)
+            if item['category'] not in categories:
+                categories.append(item['category'])
         
-        return items
+        self._by_id = by_id
+        self._by_name = by_name
+        self._by_category = by_category
+        self._categories = categories
+        self._items_cache = items
+        self._version += 1
+    
+    def version(self):
+        """Menu version; changes whenever the menu data is reloaded"""
+        self._ensure_cache()
+        return self._version
+    
+    def _ensure_cache(self):
+        """Load the menu cache on first use"""
+        if self._items_cache is None:
+            self._refresh_cache()
+    
+    def _cached_by_id(self, ids):
+        """
+        id -> item cache for resolving menu_items ids such as FTS rowids
+        An id the cache doesn't know means rows were added since it loaded,
+        so the cache is reloaded once; callers skip ids that are still missing
+        """
+        self._ensure_cache()
+        if any(item_id not in self._by_id for item_id in ids):
+            self._refresh_cache()
+        return self._by_id
+    
+    def get_all_items(self):
+        """Retrieve all menu items (cached; treat as read-only)"""
+        self._ensure_cache()
+        return self._items_cache
     
     def get_item_by_name(self, name):
         """Get specific item by name (case-insensitive)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM menu_items WHERE LOWER(name) = LOWER(?)',
-            (name,)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            item = dict(row)
-            item['ingredients'] = json.loads(item['ingredients'])
-            return item
-        return None
+        self._ensure_cache()
+        return self._by_name.get(name.lower())
     
     def get_items_by_category(self, category):
         """Get all items in a category"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM menu_items WHERE LOWER(category) = LOWER(?) ORDER BY name',
-            (category,)
-        )
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        for item in items:
-            item['ingredients'] = json.loads(item['ingredients'])
-        
+        self._ensure_cache()
+        return self._by_category.get(category.lower(), [])
+    
+    def filter_items(self, category=None, vegetarian=False, vegan=False):
+        """Get items filtered by category and dietary flags"""
+        self._ensure_cache()
+        items = self._by_category.get(category.lower(), []) if category else self._items_cache
+        if vegetarian or vegan:
+            items = [
+                item for item in items
+                if (not vegetarian or item['is_vegetarian'])
+                and (not vegan or item['is_vegan'])
+            ]
         return items
     
-    def search_items(self, keyword):
-        """Search items by keyword in name or description"""
+    def search_items(self, keyword, limit=None):
+        """
+        Search items by keyword in name or description (best match first)
+        limit caps the number of rows SQLite returns (None = no limit)
+        """
+        match_query = self._fts_match_query(keyword)
+        if match_query is None:
+            return []
+        
         conn = self.get_connection()
         cursor = conn.cursor()
-        keyword_pattern = f'%{keyword}%'
         cursor.execute('''
-            SELECT * FROM menu_items 
-            WHERE LOWER(name) LIKE LOWER(?) 
-               OR LOWER(description) LIKE LOWER(?)
-            ORDER BY category, name
-        ''', (keyword_pattern, keyword_pattern))
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            SELECT rowid AS id FROM menu_fts
+            WHERE menu_fts MATCH ?
+            ORDER BY bm25(menu_fts)
+            LIMIT ?
+        ''', (match_query, -1 if limit is None else limit))
         
-        for item in items:
-            item['ingredients'] = json.loads(item['ingredients'])
+        # Resolve ids against the cache instead of re-parsing each row
+        ids = [row['id'] for row in cursor.fetchall()]
+        by_id = self._cached_by_id(ids)
+        return [by_id[item_id] for item_id in ids if item_id in by_id]
+    
+    def search_items_batch(self, keywords, limit=None):
+        """
+        Run search_items for several keywords in as few SQL round trips as possible
+        Returns one result list per keyword (best match first), index-aligned
+        """
+        results = [[] for _ in keywords]
+        # Keywords with the same match string share one subquery
+        positions = {}
+        for index, keyword in enumerate(keywords):
+            match_query = self._fts_match_query(keyword)
+            if match_query is not None:
+                positions.setdefault(match_query, []).append(index)
+        if not positions:
+            return results
         
-        return items
+        match_queries = list(positions)
+        row_limit = -1 if limit is None else limit
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        rows = []
+        for start in range(0, len(match_queries), FTS_BATCH_SIZE):
+            selects = []
+            params = []
+            for grp, match_query in enumerate(match_queries[start:start + FTS_BATCH_SIZE], start):
+                selects.append('''
+                    SELECT * FROM (
+                        SELECT ? AS grp, rowid AS id, bm25(menu_fts) AS rank FROM menu_fts
+                        WHERE menu_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ?
+                    )
+                ''')
+                params.extend((grp, match_query, row_limit))
+            cursor.execute(' UNION ALL '.join(selects) + ' ORDER BY grp, rank', params)
+            rows.extend(cursor.fetchall())
+        
+        by_id = self._cached_by_id([row['id'] for row in rows])
+        for row in rows:
+            item = by_id.get(row['id'])
+            if item is not None:
+                for index in positions[match_queries[row['grp']]]:
+                    results[index].append(item)
+        return results
+    
+    @staticmethod
+    def _fts_match_query(keyword):
+        """Build an FTS5 MATCH string from a keyword, or None if it has no words"""
+        # Quote each word and prefix-match it ("chick" finds "chicken")
+        words = WORD_RE.findall(keyword.lower())
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
     
     def get_categories(self):
         """Get list of all unique categories"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT category FROM menu_items ORDER BY category')
-        categories = [row['category'] for row in cursor.fetchall()]
-        conn.close()
-        return categories
+        self._ensure_cache()
+        return self._categories
 
 
 # Initialize database function (called from main app)
@@ -204,4 +379,9 @@ def initialize_database(config):
     )
     
     db_manager.populate_sample_data(sample_data_path)
+    
+    # Don't keep the setup connection open: under gunicorn's preload_app it
+    # would be inherited by every forked worker, and SQLite connections must
+    # not cross a fork. Workers open their own connection on first use.
+    db_manager.close_connection()
     return db_manager
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for running DineBot in production
+Usage (from the backend folder): gunicorn -c gunicorn_conf.py app:app
+"""
+import gc
+import os
+
+# Server socket
+bind = os.environ.get('DINEBOT_BIND', '0.0.0.0:5000')
+
+# Worker processes: gevent workers serve many concurrent chat requests each
+workers = int(os.environ.get('DINEBOT_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+worker_class = 'gevent'
+worker_connections = 1000
+
+# Load the app (database, spaCy model) once in the master before forking,
+# so workers share those pages copy-on-write instead of each loading a copy
+preload_app = True
+
+# Logging
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Freeze objects loaded by the master before workers are forked"""
+    # Keeps the garbage collector in each worker from writing to (and so
+    # un-sharing) the pages that hold the preloaded spaCy model and menu
+    gc.freeze()
@@ -0,0 +1,28 @@
+"""
+Query response model for DineBot
+Slotted container for chat handler results
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Sequence
+
+
+@dataclass(slots=True)
+class QueryResponse:
+    """Result of one chat query; unset optional fields are left out of the JSON"""
+    response: str
+    data: Any = None
+    intent: str = ''
+    confidence: float = 0.0
+    suggestions: Optional[Sequence[str]] = None
+    count: Optional[int] = None
+    matched_item: Optional[str] = None
+    match_confidence: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        """Convert to the /api/chat JSON shape, omitting fields that are None"""
+        result = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is not None:
+                result[field.name] = value
+        return result
@@ -8,17 +8,270 @@ Fixes: Price query specificity, entity extraction, price range parsing
 """
 import spacy
 import re
-from fuzzywuzzy import fuzz
+import sys
+from collections import OrderedDict
+from enum import IntEnum
+from rapidfuzz import process, fuzz as rfuzz
+from rapidfuzz.distance import Levenshtein as RLevenshtein
 from typing import Dict, List, Optional, Tuple
 
+
+# ========== INTENTS ==========
+
+class Intent(IntEnum):
+    """Chat intents; values index QueryService's handler table"""
+    GREETING = 0
+    MENU_LIST = 1
+    ITEM_DETAILS = 2
+    ITEM_PRICE_QUERY = 3
+    PRICE_RANGE_QUERY = 4
+    CATEGORY_QUERY = 5
+    RESTAURANT_INFO = 6
+    UNKNOWN = 7
+
+
+# API-facing intent names ('menu_list', ...), indexed by Intent
+INTENT_LABELS = tuple(intent.name.lower() for intent in Intent)
+
+
+# ========== ENTITY KEYS ==========
+# Interned once; entity dicts are built and read with these exact objects
+
+K_CATEGORY = sys.intern('category')
+K_IS_VEGETARIAN = sys.intern('is_vegetarian')
+K_IS_VEGAN = sys.intern('is_vegan')
+K_DIETARY_FILTER = sys.intern('dietary_filter')
+K_SPICE_LEVEL = sys.intern('spice_level')
+K_PRICE_PREFERENCE = sys.intern('price_preference')
+K_POTENTIAL_ITEMS = sys.intern('potential_items')
+K_MAX_PRICE = sys.intern('max_price')
+K_MIN_PRICE = sys.intern('min_price')
+K_MAX_INCLUSIVE = sys.intern('max_inclusive')
+K_MIN_INCLUSIVE = sys.intern('min_inclusive')
+
+
+# ========== PRECOMPILED PATTERNS ==========
+# Compiled once at import so the chat hot path only runs pattern.search()
+
+# Greeting patterns
+GREETING_PATTERNS = [
+    r'\b(hi|hello|hey|greetings|good morning|good evening)\b'
+]
+
+# Menu listing patterns
+MENU_PATTERNS = [
+    r'\b(show|display|list|what).*(menu|items|dishes|food)',
+    r'\bwhat.*(?:have|available|serve)',
+    r'\bmenu\b(?!.*price)',  # "menu" but not "menu price"
+]
+
+# FIX 1: Enhanced price patterns with specificity detection
+# General price range patterns (CHECK FIRST - higher priority)
+PRICE_RANGE_PATTERNS = [
+    r'\b(?:menu|all|overall|general)\s*(?:price|cost|rate)',  # "menu prices"
+    r'\bprice\s*(?:range|list)',  # "price range"
+    r'\bhow much.*(?:everything|menu|all)',  # "how much for everything"
+    r'\bwhat.*(?:price|cost).*(?:in general|overall|menu)',
+    r'\b(?:show|tell|what).*(?:menu|all).*(?:price|cost)',  # "show menu prices"
+]
+
+# Item-specific price patterns (check second - lower priority)
+ITEM_PRICE_PATTERNS = [
+    r'\b\w+\s+(cost|price|rate)',  # "pizza cost", "biryani price"
+    r'\bhow much.*(?:is|for|does)\s+(?:the\s+)?\w+',  # "how much is pizza"
+    r'\bprice.*(?:of|for)\s+\w+',  # "price of pizza"
+    r'\bcost.*(?:of|for)\s+\w+',  # "cost of chicken"
+    r'\bwhat.*(?:cost|price).*\w+(?:cost|price)',  # "what's the pizza price"
+]
+
+# Generic price/cost mention (could be either)
+GENERIC_PRICE_PATTERNS = [
+    r'\b(price|cost|how much|rate|expensive|cheap)'
+]
+
+# Item details patterns
+DETAILS_PATTERNS = [
+    r'\b(tell|what|about|info|details|describe).*(?!price|cost)',
+    r'\b(ingredient|contain|made of|recipe)',
+    r'\b(vegetarian|vegan|spicy|spice level)'
+]
+
+# Category query patterns
+CATEGORY_PATTERNS = [
+    r'\b(appetizer|starter|main course|dessert|beverage|drink)',
+    r'\bshow.*(category|type)',
+    r'\b(?:list|show).*(?:appetizer|starter|main|dessert|beverage)'
+]
+
+# Restaurant info patterns
+HOURS_RE = re.compile(r'\b(timing|hours|open|close|when)')
+ADDRESS_RE = re.compile(r'\b(address|location|where|situated)')
+CONTACT_RE = re.compile(r'\b(contact|phone|email|call)')
+INFO_PATTERNS = [
+    ADDRESS_RE.pattern,
+    HOURS_RE.pattern,
+    CONTACT_RE.pattern,
+    r'\b(about|info).*restaurant',
+    r'\brestaurant.*(?:info|detail|about)'
+]
+
+# Pattern groups in the priority order _extract_intent checks them
+ORDERED_PATTERNS = [
+    ('greeting', GREETING_PATTERNS),
+    ('price_range', PRICE_RANGE_PATTERNS),
+    ('item_price', ITEM_PRICE_PATTERNS),
+    ('generic_price', GENERIC_PRICE_PATTERNS),
+    ('category', CATEGORY_PATTERNS),
+    ('info', INFO_PATTERNS),
+    ('details', DETAILS_PATTERNS),
+    ('menu', MENU_PATTERNS),
+]
+
+# All intent patterns fused into one regex: every group is an optional
+# lookahead anchored at the start, so a single match() reports every group
+# that occurs anywhere in the text (same as one re.search per pattern)
+INTENT_RE = re.compile(''.join(
+    f"(?=(?s:.*?)(?P<{name}>{'|'.join(f'(?:{p})' for p in patterns)}))?"
+    for name, patterns in ORDERED_PATTERNS
+))
+
+# Fixed (intent, confidence) for groups that don't need extra checks
+INTENT_RESULTS = {
+    'greeting': (Intent.GREETING, 0.9),
+    'price_range': (Intent.PRICE_RANGE_QUERY, 0.9),
+    'category': (Intent.CATEGORY_QUERY, 0.85),
+    'info': (Intent.RESTAURANT_INFO, 0.85),
+    'details': (Intent.ITEM_DETAILS, 0.8),
+    'menu': (Intent.MENU_LIST, 0.85),
+}
+
+# ========== KEYWORD FAST PATH ==========
+# Checked before INTENT_RE with a set lookup on the query's words
+
+# Greeting has the highest priority, so any of these words decides it
+GREETING_KW = frozenset({'hi', 'hello', 'hey', 'greetings'})
+
+# Common one-word queries answered without running the regex
+INTENT_KEYWORDS = frozenset({
+    'menu', 'dishes', 'items', 'food',
+    'appetizer', 'appetizers', 'starter', 'starters', 'dessert', 'desserts',
+    'beverage', 'beverages', 'drink', 'drinks', 'categories',
+    'address', 'location', 'where', 'timing', 'timings', 'hours', 'open',
+    'contact', 'phone', 'email',
+    'ingredients', 'vegetarian', 'vegan', 'spicy',
+})
+
+
+def _keyword_intent(word: str) -> Optional[Tuple[Intent, float]]:
+    """Classify a one-word query the same way _extract_intent's regex does"""
+    matches = INTENT_RE.match(word)
+    for group, _ in ORDERED_PATTERNS:
+        if matches.group(group) is not None:
+            # Price groups depend on spaCy at runtime, so leave them out
+            return INTENT_RESULTS.get(group)
+    return (Intent.ITEM_DETAILS, 0.6)  # Short-query fallback
+
+
+# Precomputed from INTENT_RE, so the fast path can't disagree with it
+KEYWORD_INTENTS = {
+    word: result for word, result in
+    ((word, _keyword_intent(word)) for word in INTENT_KEYWORDS)
+    if result is not None
+}
+
+# Entity patterns (dietary flags, spice level, price preference)
+VEG_RE = re.compile(r'\b(vegetarian|veg\b|veggie)')
+VEGAN_RE = re.compile(r'\bvegan\b')
+NONVEG_RE = re.compile(r'\b(non-veg|non veg|nonveg|meat|chicken|fish)')
+SPICY_RE = re.compile(r'\b(spicy|hot|chili)')
+MILD_RE = re.compile(r'\b(mild|less spicy|not spicy)')
+CHEAP_RE = re.compile(r'\b(cheap|affordable|budget|low price)')
+EXPENSIVE_RE = re.compile(r'\b(expensive|premium|costly)')
+
+# Price boundary patterns
+UNDER_RE = re.compile(r'\b(?:under|below|less than)\s+(\d+)')
+OR_LESS_RE = re.compile(r'\b(\d+)\s+or\s+less|up\s+to\s+(\d+)')
+ABOVE_RE = re.compile(r'\b(?:above|over|more than|greater than)\s+(\d+)')
+OR_MORE_RE = re.compile(r'\b(\d+)\s+or\s+more|at\s+least\s+(\d+)')
+BETWEEN_RE = re.compile(r'\bbetween\s+(\d+)\s+and\s+(\d+)')
+GENERIC_NUMBER_RE = re.compile(r'\b(\d+)\s*(?:rupees|rs|₹)?')
+LESS_HINT_RE = re.compile(r'\b(?:under|less|below)')
+
+# Generic nouns that are never dish names
+GENERIC_PHRASES = frozenset([
+    'price', 'cost', 'menu', 'item', 'dish', 'food',
+    'option', 'thing', 'restaurant', 'the price'
+])
+
+# Price-related words stripped before fuzzy matching
+PRICE_WORDS_RE = re.compile(r'\b(price|cost|rate|how much|rupees|rs)\b')
+
+# Non-alphanumerics blanked out before token-sort comparison
+NON_ALNUM_RE = re.compile(r'(?ui)\W')
+
+
+# ========== FUZZY SCORING ==========
+# rapidfuzz's own partial_ratio finds the optimal alignment and scores short
+# queries far higher than fuzzywuzzy did ("vegan" -> Veg Spring Rolls), so
+# the matcher rebuilds fuzzywuzzy's max(ratio, partial_ratio,
+# token_sort_ratio) from rapidfuzz primitives to keep the tuned
+# SIMILARITY_THRESHOLD meaningful
+
+def _ratio(s1: str, s2: str) -> int:
+    """fuzzywuzzy fuzz.ratio: rounded Indel similarity"""
+    if not s1 or not s2:
+        return 0
+    return int(round(rfuzz.ratio(s1, s2)))
+
+
+def _partial_ratio(s1: str, s2: str) -> int:
+    """fuzzywuzzy fuzz.partial_ratio: best ratio over matching-block windows"""
+    if not s1 or not s2:
+        return 0
+    shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
+    best = 0.0
+    for block in RLevenshtein.editops(shorter, longer).as_matching_blocks():
+        start = max(block.b - block.a, 0)
+        score = rfuzz.ratio(shorter, longer[start:start + len(shorter)])
+        if score > 99.5:
+            return 100
+        best = max(best, score)
+    return int(round(best))
+
+
+def _token_sort_key(text: str) -> str:
+    """fuzzywuzzy full_process + sorted tokens"""
+    text = NON_ALNUM_RE.sub(' ', text.encode('ascii', 'ignore').decode()).lower()
+    return ' '.join(sorted(text.split()))
+
+
+def _token_sort_ratio(s1: str, s2: str) -> int:
+    """fuzzywuzzy fuzz.token_sort_ratio"""
+    return _ratio(_token_sort_key(s1), _token_sort_key(s2))
+
+
+def item_name_score(query: str, name: str, **kwargs) -> int:
+    """
+    Similarity (0-100) of a query to an item name, as the original
+    fuzzywuzzy matcher scored it; usable as a rapidfuzz scorer
+    """
+    return max(_ratio(query, name), _partial_ratio(query, name), _token_sort_ratio(query, name))
+
+
 class NLPService:
     """Handles natural language understanding for DineBot with enhanced accuracy"""
     
     def __init__(self, config):
         """Initialize NLP service with spaCy model"""
         self.config = config
+        
+        # LRU cache of process_query results keyed by normalized query
+        self._cache: Dict[str, Dict] = OrderedDict()
+        self._cache_size = config.NLP_CACHE_SIZE
+        self._cache_max_query_length = config.NLP_CACHE_MAX_QUERY_LENGTH
+        
         try:
-            self.nlp = spacy.load(config.SPACY_MODEL)
+            self.nlp = spacy.load(config.SPACY_MODEL, disable=config.SPACY_DISABLED_PIPES)
             print(f"✓ Loaded spaCy model: {config.SPACY_MODEL}")
         except OSError:
             print(f"⚠ spaCy model not found. Run: python -m spacy download {config.SPACY_MODEL}")
@@ -28,30 +281,46 @@ class NLPService:
         """
         Process user input and extract intent + entities
         Returns: {
-            'intent': str,
+            'intent': Intent,
             'entities': dict,
             'confidence': float,
-            'has_specific_item': bool  # NEW: indicates if query mentions specific dish
+            'original_query': str  # Normalized (stripped, lowercased) input
         }
+        Results are cached per normalized query (up to
+        NLP_CACHE_MAX_QUERY_LENGTH characters); treat them as read-only
         """
         user_input = user_input.strip().lower()
         
+        cached = self._cache.get(user_input)
+        if cached is not None:
+            try:
+                self._cache.move_to_end(user_input)
+            except KeyError:
+                pass  # Evicted by another thread in the meantime
+            return cached
+        
         # Extract intent using enhanced pattern matching
         intent_result = self._extract_intent(user_input)
         
         # Extract entities (dish names, categories, price bounds, etc.)
         entities = self._extract_entities(user_input)
         
-        # FIX 1: Detect if query contains specific item name
-        has_specific_item = self._has_specific_item_mention(user_input, entities)
-        
-        return {
+        result = {
             'intent': intent_result['intent'],
             'entities': entities,
             'confidence': intent_result['confidence'],
-            'has_specific_item': has_specific_item,
             'original_query': user_input
         }
+        
+        # Store result, evicting the least recently used entry when full.
+        # Long queries are rarely repeated and would let the cache hold
+        # NLP_CACHE_SIZE arbitrarily large messages, so they are not stored
+        if len(user_input) <= self._cache_max_query_length:
+            self._cache[user_input] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        
+        return result
     
     def _extract_intent(self, text: str) -> Dict:
         """
@@ -64,98 +333,41 @@ class NLPService:
         - "price of chicken tikka" → item_price_query (specific item)
         """
         
-        # Greeting patterns
-        greeting_patterns = [
-            r'\b(hi|hello|hey|greetings|good morning|good evening)\b'
-        ]
-        
-        # Menu listing patterns
-        menu_patterns = [
-            r'\b(show|display|list|what).*(menu|items|dishes|food)',
-            r'\bwhat.*(?:have|available|serve)',
-            r'\bmenu\b(?!.*price)',  # "menu" but not "menu price"
-        ]
-        
-        # FIX 1: Enhanced price patterns with specificity detection
-        # General price range patterns (CHECK FIRST - higher priority)
-        price_range_patterns = [
-            r'\b(?:menu|all|overall|general)\s*(?:price|cost|rate)',  # "menu prices"
-            r'\bprice\s*(?:range|list)',  # "price range"
-            r'\bhow much.*(?:everything|menu|all)',  # "how much for everything"
-            r'\bwhat.*(?:price|cost).*(?:in general|overall|menu)',
-            r'\b(?:show|tell|what).*(?:menu|all).*(?:price|cost)',  # "show menu prices"
-        ]
-        
-        # Item-specific price patterns (check second - lower priority)
-        item_price_patterns = [
-            r'\b\w+\s+(cost|price|rate)',  # "pizza cost", "biryani price"
-            r'\bhow much.*(?:is|for|does)\s+(?:the\s+)?\w+',  # "how much is pizza"
-            r'\bprice.*(?:of|for)\s+\w+',  # "price of pizza"
-            r'\bcost.*(?:of|for)\s+\w+',  # "cost of chicken"
-            r'\bwhat.*(?:cost|price).*\w+(?:cost|price)',  # "what's the pizza price"
-        ]
-        
-        # Item details patterns
-        details_patterns = [
-            r'\b(tell|what|about|info|details|describe).*(?!price|cost)',
-            r'\b(ingredient|contain|made of|recipe)',
-            r'\b(vegetarian|vegan|spicy|spice level)'
-        ]
-        
-        # Category query patterns
-        category_patterns = [
-            r'\b(appetizer|starter|main course|dessert|beverage|drink)',
-            r'\bshow.*(category|type)',
-            r'\b(?:list|show).*(?:appetizer|starter|main|dessert|beverage)'
-        ]
-        
-        # Restaurant info patterns
-        info_patterns = [
-            r'\b(address|location|where|situated)',
-            r'\b(timing|hours|open|close|when)',
-            r'\b(contact|phone|email|call)',
-            r'\b(about|info).*restaurant',
-            r'\brestaurant.*(?:info|detail|about)'
-        ]
-        
-        # Check patterns in priority order
-        if any(re.search(p, text) for p in greeting_patterns):
-            return {'intent': 'greeting', 'confidence': 0.9}
-        
-        # FIX 1: Check general price range patterns FIRST (they're more specific)
-        if any(re.search(p, text) for p in price_range_patterns):
-            return {'intent': 'price_range_query', 'confidence': 0.9}
-        
-        # Then check item-specific price patterns
-        if any(re.search(p, text) for p in item_price_patterns):
-            # Additional check: ensure there's a potential item name
-            if self._contains_potential_item_name(text):
-                return {'intent': 'item_price_query', 'confidence': 0.9}
-        
-        # Generic price/cost mention (could be either)
-        if re.search(r'\b(price|cost|how much|rate|expensive|cheap)', text):
-            # If contains item indicators, treat as item query
-            if self._contains_potential_item_name(text):
-                return {'intent': 'item_price_query', 'confidence': 0.75}
-            return {'intent': 'price_range_query', 'confidence': 0.7}
+        # Fast path: keyword set lookups before running the big regex
+        words = text.split()
+        if not GREETING_KW.isdisjoint(words):
+            return {'intent': Intent.GREETING, 'confidence': 0.9}
+        if len(words) == 1 and words[0] in KEYWORD_INTENTS:
+            intent, confidence = KEYWORD_INTENTS[words[0]]
+            return {'intent': intent, 'confidence': confidence}
         
-        if any(re.search(p, text) for p in category_patterns):
-            return {'intent': 'category_query', 'confidence': 0.85}
+        matches = INTENT_RE.match(text)
         
-        if any(re.search(p, text) for p in info_patterns):
-            return {'intent': 'restaurant_info', 'confidence': 0.85}
-        
-        if any(re.search(p, text) for p in details_patterns):
-            return {'intent': 'item_details', 'confidence': 0.8}
-        
-        if any(re.search(p, text) for p in menu_patterns):
-            return {'intent': 'menu_list', 'confidence': 0.85}
+        # Check pattern groups in priority order
+        for group, _ in ORDERED_PATTERNS:
+            if matches.group(group) is None:
+                continue
+            
+            # Item-specific price: ensure there's a potential item name
+            if group == 'item_price':
+                if self._contains_potential_item_name(text):
+                    return {'intent': Intent.ITEM_PRICE_QUERY, 'confidence': 0.9}
+                continue
+            
+            # Generic price/cost mention: item query if it names an item
+            if group == 'generic_price':
+                if self._contains_potential_item_name(text):
+                    return {'intent': Intent.ITEM_PRICE_QUERY, 'confidence': 0.75}
+                return {'intent': Intent.PRICE_RANGE_QUERY, 'confidence': 0.7}
+            
+            intent, confidence = INTENT_RESULTS[group]
+            return {'intent': intent, 'confidence': confidence}
         
         # Default to item details for simple queries
-        if len(text.split()) <= 3:
-            return {'intent': 'item_details', 'confidence': 0.6}
+        if len(words) <= 3:
+            return {'intent': Intent.ITEM_DETAILS, 'confidence': 0.6}
         
-        return {'intent': 'unknown', 'confidence': 0.3}
+        return {'intent': Intent.UNKNOWN, 'confidence': 0.3}
     
     def _contains_potential_item_name(self, text: str) -> bool:
         """
@@ -186,27 +398,6 @@ class NLPService:
         
         return False
     
-    def _has_specific_item_mention(self, text: str, entities: Dict) -> bool:
-        """
-        FIX 1: Determine if query mentions a specific item vs. general category
-        """
-        # If we found potential items in entity extraction
-        if 'potential_items' in entities and entities['potential_items']:
-            return True
-        
-        # If query has food-related words
-        if self._contains_potential_item_name(text):
-            return True
-        
-        # If query is very short and has a noun (likely item name)
-        if len(text.split()) <= 3 and self.nlp:
-            doc = self.nlp(text)
-            for token in doc:
-                if token.pos_ == 'NOUN' and token.text not in ['price', 'cost', 'menu']:
-                    return True
-        
-        return False
-    
     def _extract_entities(self, text: str) -> Dict:
         """
         Enhanced entity extraction with better price bounds and dietary flags
@@ -220,32 +411,32 @@ class NLPService:
         categories = ['appetizer', 'starter', 'main course', 'dessert', 'beverage', 'drink']
         for category in categories:
             if category in text:
-                entities['category'] = category
+                entities[K_CATEGORY] = category
                 if category == 'drink':
-                    entities['category'] = 'beverage'
+                    entities[K_CATEGORY] = 'beverage'
                 if category == 'starter':
-                    entities['category'] = 'appetizer'
+                    entities[K_CATEGORY] = 'appetizer'
                 break
         
         # FIX 2: Enhanced dietary preference extraction
         # Map to strict boolean flags
-        if re.search(r'\b(vegetarian|veg\b|veggie)', text):
-            entities['is_vegetarian'] = True
-            entities['dietary_filter'] = 'vegetarian'
+        if VEG_RE.search(text):
+            entities[K_IS_VEGETARIAN] = True
+            entities[K_DIETARY_FILTER] = 'vegetarian'
         
-        if re.search(r'\bvegan\b', text):
-            entities['is_vegan'] = True
-            entities['dietary_filter'] = 'vegan'
+        if VEGAN_RE.search(text):
+            entities[K_IS_VEGAN] = True
+            entities[K_DIETARY_FILTER] = 'vegan'
         
-        if re.search(r'\b(non-veg|non veg|nonveg|meat|chicken|fish)', text):
-            entities['is_vegetarian'] = False
-            entities['dietary_filter'] = 'non-vegetarian'
+        if NONVEG_RE.search(text):
+            entities[K_IS_VEGETARIAN] = False
+            entities[K_DIETARY_FILTER] = 'non-vegetarian'
         
         # Extract spice level
-        if re.search(r'\b(spicy|hot|chili)', text):
-            entities['spice_level'] = 'hot'
-        if re.search(r'\b(mild|less spicy|not spicy)', text):
-            entities['spice_level'] = 'mild'
+        if SPICY_RE.search(text):
+            entities[K_SPICE_LEVEL] = 'hot'
+        if MILD_RE.search(text):
+            entities[K_SPICE_LEVEL] = 'mild'
         
         # FIX 3: Enhanced price boundary extraction
         price_bounds = self._extract_price_bounds(text)
@@ -253,24 +444,28 @@ class NLPService:
             entities.update(price_bounds)
         
         # Extract price preference
-        if re.search(r'\b(cheap|affordable|budget|low price)', text):
-            entities['price_preference'] = 'low'
-        if re.search(r'\b(expensive|premium|costly)', text):
-            entities['price_preference'] = 'high'
+        if CHEAP_RE.search(text):
+            entities[K_PRICE_PREFERENCE] = 'low'
+        if EXPENSIVE_RE.search(text):
+            entities[K_PRICE_PREFERENCE] = 'high'
         
         # Use spaCy for entity extraction if available
         if self.nlp:
-            doc = self.nlp(text)
-            # Extract noun phrases as potential dish names
-            noun_phrases = [chunk.text for chunk in doc.noun_chunks]
+            # Short queries ("pizza", "mango lassi") are the dish name itself,
+            # so skip the spaCy call and use the raw text
+            if len(text.split()) <= 2:
+                noun_phrases = [text]
+            else:
+                doc = self.nlp(text)
+                # Extract noun phrases as potential dish names
+                noun_phrases = [chunk.text for chunk in doc.noun_chunks]
             # Filter out generic nouns
             filtered_phrases = [
                 phrase for phrase in noun_phrases 
-                if phrase not in ['price', 'cost', 'menu', 'item', 'dish', 'food', 
-                                 'option', 'thing', 'restaurant', 'the price']
+                if phrase not in GENERIC_PHRASES
             ]
             if filtered_phrases:
-                entities['potential_items'] = filtered_phrases
+                entities[K_POTENTIAL_ITEMS] = filtered_phrases
         
         return entities
     
@@ -288,96 +483,101 @@ class NLPService:
         bounds = {}
         
         # Pattern: "under X" or "below X" (strict less than)
-        under_match = re.search(r'\b(?:under|below|less than)\s+(\d+)', text)
+        under_match = UNDER_RE.search(text)
         if under_match:
             # FIX 3: Use strict < by subtracting 1 from the number
             value = int(under_match.group(1))
-            bounds['max_price'] = value - 1
-            bounds['max_inclusive'] = True  # Since we already subtracted 1
+            bounds[K_MAX_PRICE] = value - 1
+            bounds[K_MAX_INCLUSIVE] = True  # Since we already subtracted 1
         
         # Pattern: "X or less" or "up to X" (inclusive)
-        or_less_match = re.search(r'\b(\d+)\s+or\s+less|up\s+to\s+(\d+)', text)
+        or_less_match = OR_LESS_RE.search(text)
         if or_less_match:
             value = or_less_match.group(1) or or_less_match.group(2)
-            bounds['max_price'] = int(value)
-            bounds['max_inclusive'] = True
+            bounds[K_MAX_PRICE] = int(value)
+            bounds[K_MAX_INCLUSIVE] = True
         
         # Pattern: "above X" or "over X" or "more than X" (strict greater than)
-        above_match = re.search(r'\b(?:above|over|more than|greater than)\s+(\d+)', text)
+        above_match = ABOVE_RE.search(text)
         if above_match:
-            bounds['min_price'] = int(above_match.group(1)) + 1
-            bounds['min_inclusive'] = False
+            bounds[K_MIN_PRICE] = int(above_match.group(1)) + 1
+            bounds[K_MIN_INCLUSIVE] = False
         
         # Pattern: "X or more" or "at least X" (inclusive)
-        or_more_match = re.search(r'\b(\d+)\s+or\s+more|at\s+least\s+(\d+)', text)
+        or_more_match = OR_MORE_RE.search(text)
         if or_more_match:
             value = or_more_match.group(1) or or_more_match.group(2)
-            bounds['min_price'] = int(value)
-            bounds['min_inclusive'] = True
+            bounds[K_MIN_PRICE] = int(value)
+            bounds[K_MIN_INCLUSIVE] = True
         
         # Pattern: "between X and Y"
-        between_match = re.search(r'\bbetween\s+(\d+)\s+and\s+(\d+)', text)
+        between_match = BETWEEN_RE.search(text)
         if between_match:
-            bounds['min_price'] = int(between_match.group(1))
-            bounds['max_price'] = int(between_match.group(2))
-            bounds['min_inclusive'] = True
-            bounds['max_inclusive'] = True
+            bounds[K_MIN_PRICE] = int(between_match.group(1))
+            bounds[K_MAX_PRICE] = int(between_match.group(2))
+            bounds[K_MIN_INCLUSIVE] = True
+            bounds[K_MAX_INCLUSIVE] = True
         
         # Pattern: generic number mention (e.g., "300 rupees")
         if not bounds:
-            generic_match = re.search(r'\b(\d+)\s*(?:rupees|rs|₹)?', text)
+            generic_match = GENERIC_NUMBER_RE.search(text)
             if generic_match:
                 # If "under" or "less" appears nearby, treat as max
-                if re.search(r'\b(?:under|less|below)', text):
-                    bounds['max_price'] = int(generic_match.group(1)) - 1
-                    bounds['max_inclusive'] = False
+                if LESS_HINT_RE.search(text):
+                    bounds[K_MAX_PRICE] = int(generic_match.group(1)) - 1
+                    bounds[K_MAX_INCLUSIVE] = False
         
         return bounds
     
-    def fuzzy_match_item(self, query: str, menu_items: List[Dict], threshold: float = None) -> Optional[Dict]:
+    def fuzzy_match_item(self, query: str, menu_items: List[Dict], threshold: float = None,
+                         names_lower: List[str] = None) -> Optional[Dict]:
         """
         Find best matching menu item using fuzzy string matching
         Enhanced to better handle partial names
+        Expects the normalized (lowercased) query produced by process_query;
+        names_lower are the item names pre-lowered (or normalized) in menu_items order
         """
         if threshold is None:
             threshold = self.config.SIMILARITY_THRESHOLD * 100
         
-        best_match = None
-        best_score = 0
-        
         # Extract potential item name from query
         # Remove price-related words first
-        cleaned_query = re.sub(r'\b(price|cost|rate|how much|rupees|rs)\b', '', query)
+        cleaned_query = PRICE_WORDS_RE.sub('', query)
         cleaned_query = cleaned_query.strip()
         
-        for item in menu_items:
-            # Calculate multiple similarity scores
-            full_score = fuzz.ratio(cleaned_query.lower(), item['name'].lower())
-            partial_score = fuzz.partial_ratio(cleaned_query.lower(), item['name'].lower())
-            token_score = fuzz.token_sort_ratio(cleaned_query.lower(), item['name'].lower())
-            
-            # Take the best score
-            score = max(full_score, partial_score, token_score)
-            
-            if score > best_score:
-                best_score = score
-                best_match = item
-        
-        # Return match only if above threshold
-        if best_score >= threshold:
+        # Best match above threshold; the first item wins ties
+        # Inputs are already lowercase, so skip rapidfuzz's own preprocessing
+        if names_lower is None:
+            names_lower = [item['name'].lower() for item in menu_items]
+        result = process.extractOne(
+            cleaned_query, names_lower,
+            scorer=item_name_score, processor=None, score_cutoff=threshold
+        )
+        
+        if result:
+            _, score, index = result
             return {
-                'item': best_match,
-                'confidence': best_score / 100.0
+                'item': menu_items[index],
+                'confidence': score / 100.0
             }
         
         return None
     
+    def process_batch(self, texts: List[str], batch_size: int = 32) -> List:
+        """
+        Run several texts through spaCy in one batched nlp.pipe() call
+        Returns an empty list when the spaCy model isn't loaded
+        """
+        if not self.nlp:
+            return []
+        return list(self.nlp.pipe(texts, batch_size=batch_size))
+    
     def extract_info_type(self, text: str) -> str:
         """Determine what type of restaurant info user is asking about"""
-        if re.search(r'\b(timing|hours|open|close|when)', text):
+        if HOURS_RE.search(text):
             return 'hours'
-        if re.search(r'\b(address|location|where|situated)', text):
+        if ADDRESS_RE.search(text):
             return 'address'
-        if re.search(r'\b(contact|phone|email|call)', text):
+        if CONTACT_RE.search(text):
             return 'contact'
         return 'general'
\ No newline at end of file
@@ -5,9 +5,79 @@ Handles business logic and response generation
 Enhanced Query Service for DineBot
 Fixes: Item-specific price queries, strict dietary filtering, price boundary logic
 """
+import hashlib
+from collections import deque
+import operator
 import random
 import re
-from typing import Dict, List, Optional
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from models.query_response import QueryResponse
+from services.nlp_service import (
+    Intent, INTENT_LABELS, K_CATEGORY, K_IS_VEGETARIAN, K_IS_VEGAN, K_DIETARY_FILTER,
+    K_SPICE_LEVEL, K_PRICE_PREFERENCE, K_POTENTIAL_ITEMS, K_MAX_PRICE, K_MIN_PRICE,
+    K_MAX_INCLUSIVE, K_MIN_INCLUSIVE
+)
+
+# Shortest query the name trie will resolve as a prefix ("piz" -> pizza)
+TRIE_MIN_PREFIX = 3
+
+# Match confidence (0-1) an item-name match must exceed to be answered directly
+MATCH_CONFIDENCE_MIN = 0.6
+
+# Item fields shown in menu listings, in _format_menu_items output order
+MENU_ITEM_FIELDS = operator.itemgetter(
+    'name', 'price', 'category', 'description', 'is_vegetarian', 'is_vegan', 'spice_level'
+)
+
+# Menu-list filters not covered by the precomputed (category, veg, vegan) slices
+MENU_EXTRA_FILTERS = (K_SPICE_LEVEL, K_MAX_PRICE, K_MIN_PRICE, K_PRICE_PREFERENCE)
+
+GREETINGS = (
+    "Hello! Welcome to The Golden Spoon. How can I help you today?",
+    "Hi there! I'm DineBot, your virtual assistant. Ask me about our menu!",
+    "Greetings! Looking for something delicious? I can help you explore our menu.",
+)
+
+# Random replies drawn per refill of the greeting/fallback buffers
+RESPONSE_BUFFER_SIZE = 128
+
+GREETING_SUGGESTIONS = (
+    'Show me the menu',
+    'What are your timings?',
+    'Tell me about desserts'
+)
+
+UNKNOWN_SUGGESTIONS = (
+    'Show me the menu',
+    'What are your timings?',
+    'Tell me about your location'
+)
+
+NO_MENU_MATCH_SUGGESTIONS = (
+    'Show me the full menu',
+    'What vegetarian options do you have?',
+    'Show me appetizers'
+)
+
+ITEM_PRICE_SUGGESTIONS = (
+    'Show me the menu',
+    'How much is pizza?',
+    'What are your prices?'
+)
+
+PRICE_RANGE_SUGGESTIONS = ('Show me the full menu',)
+
+ITEM_DETAIL_SUGGESTIONS = ('Show menu', 'What are your appetizers?', 'Tell me about desserts')
+
+
+def normalize_name(text: str) -> str:
+    """Fold accents to ASCII and lowercase ("Crème Brûlée" -> "creme brulee")"""
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
 
 class QueryService:
     """Processes intents and generates appropriate responses with enhanced filtering"""
@@ -17,79 +87,246 @@ class QueryService:
         self.db = db_manager
         self.nlp = nlp_service
         self.config = config
+        
+        # Menu data derived from the database, rebuilt by _items() whenever
+        # the database's menu version changes
+        self._items_cache: List[Dict] = None
+        self._items_version = -1
+        self._by_category: Dict[str, List[Dict]] = {}
+        self._normalized_names: List[str] = []  # See normalize_name(); fuzzy match choices
+        self._name_trie: Dict = {}
+        self._name_docs = []
+        self._formatted_menu: Dict[Tuple[str, bool, bool], List[Dict]] = {}
+        # (min, max, average, count) of prices under the same keys
+        self._price_stats: Dict[Tuple[str, bool, bool], Tuple[int, int, float, int]] = {}
+        self._item_detail_strings: Dict[str, str] = {}  # Item name -> details text
+        self._all_categories_response: Tuple[str, Dict] = ('', {})  # (text, data)
+        
+        # Restaurant info replies, rendered once from the static config
+        self._info_strings = self._render_info_strings(config.RESTAURANT_INFO)
+        
+        # Serialized /api/menu bodies keyed by (category, vegetarian, vegan);
+        # category None stands for any category not on the menu
+        self._menu_json_cache: Dict[Tuple[Optional[str], bool, bool], Tuple[bytes, str]] = {}
+        
+        # Service-owned RNG; choices bound once for the reply buffers
+        self._rng = random.Random()
+        self._choices = self._rng.choices
+        
+        # Pre-drawn random greeting/fallback replies, refilled when exhausted
+        self._fallback_responses = tuple(config.FALLBACK_RESPONSES)
+        self._greeting_buf = deque()
+        self._fallback_buf = deque()
+        
+        # Bound handlers indexed by Intent value, built once instead of per request
+        handlers = {
+            Intent.GREETING: self._greeting_response,
+            Intent.MENU_LIST: self._handle_menu_list,
+            Intent.ITEM_DETAILS: self._handle_item_details,
+            Intent.ITEM_PRICE_QUERY: self._handle_item_price_query,  # FIX 1: New handler
+            Intent.PRICE_RANGE_QUERY: self._handle_price_range_query,  # FIX 1: Renamed
+            Intent.CATEGORY_QUERY: self._handle_category_query,
+            Intent.RESTAURANT_INFO: self._handle_restaurant_info,
+            Intent.UNKNOWN: self._handle_unknown,
+        }
+        self._handler_table = tuple(handlers[intent] for intent in Intent)
+        
+        self._items()
+    
+    def _items(self) -> List[Dict]:
+        """Get all menu items, rebuilding the derived caches if the menu changed"""
+        version = self.db.version()
+        if version != self._items_version:
+            items = self.db.get_all_items()
+            
+            # Category-indexed items (lowercase keys), kept in menu order
+            by_category = {}
+            for item in items:
+                by_category.setdefault(item['category'].lower(), []).append(item)
+            
+            self._by_category = by_category
+            self._normalized_names = [normalize_name(item['name']) for item in items]
+            self._name_trie = self._build_name_trie(items, self._normalized_names)
+            
+            # Pre-tokenize menu item names in a single batched spaCy pass
+            names = [item['name'] for item in items]
+            self._name_docs = self.nlp.process_batch(names, batch_size=64)
+            
+            # Formatted menu slices and price statistics per
+            # (category, vegetarian, vegan) filter
+            formatted_menu = {}
+            price_stats = {}
+            for category, category_items in [('', items)] + list(by_category.items()):
+                for veg in (False, True):
+                    for vegan in (False, True):
+                        filtered = self._apply_dietary_filters(
+                            category_items, {K_IS_VEGETARIAN: veg or None, K_IS_VEGAN: vegan}
+                        )
+                        formatted_menu[(category, veg, vegan)] = self._format_menu_items(filtered)
+                        if filtered:
+                            prices = [item['price'] for item in filtered]
+                            price_stats[(category, veg, vegan)] = (
+                                min(prices), max(prices),
+                                sum(prices) / len(prices), len(prices)
+                            )
+            self._formatted_menu = formatted_menu
+            self._price_stats = price_stats
+            self._item_detail_strings = {
+                item['name']: self._format_item_details(item) for item in items
+            }
+            categories = self.db.get_categories()
+            self._all_categories_response = (
+                f"We have these categories: {', '.join(categories)}. Which would you like to explore?",
+                {'categories': categories}
+            )
+            
+            self._menu_json_cache = {}
+            self._items_cache = items
+            self._items_version = version
+        return self._items_cache
+    
+    @staticmethod
+    def _build_name_trie(items: List[Dict], names: List[str]) -> Dict:
+        """
+        Build a character trie over normalized item names
+        Each node: {'children': {char: node}, 'ends': items whose name ends here,
+                    'items': items whose name passes through this node}
+        Several items can end at one node when their names fold to the same
+        ASCII ("Crème Brûlée" / "Creme Brulee")
+        """
+        root = {'children': {}, 'ends': [], 'items': []}
+        for item, name in zip(items, names):
+            node = root
+            for char in name:
+                node = node['children'].setdefault(
+                    char, {'children': {}, 'ends': [], 'items': []}
+                )
+                node['items'].append(item)
+            node['ends'].append(item)
+        return root
     
-    def handle_query(self, user_input: str) -> Dict:
+    def _trie_lookup(self, query: str) -> Optional[Dict]:
+        """
+        Walk the name trie along the query in O(len(query))
+        Returns the item whose full name is the query, or the only item the
+        query is a prefix of; None when the path breaks off or is ambiguous
+        """
+        query = query.strip()
+        folded = normalize_name(query)
+        if len(folded) < TRIE_MIN_PREFIX:
+            return None
+        
+        self._items()
+        node = self._name_trie
+        for char in folded:
+            node = node['children'].get(char)
+            if node is None:
+                return None
+        
+        ends = node['ends']
+        if len(ends) == 1:
+            return ends[0]
+        if ends:
+            # Folded-name collision: only an unfolded exact match decides it
+            query = query.lower()
+            for item in ends:
+                if item['name'].lower() == query:
+                    return item
+            return None
+        if len(node['items']) == 1:
+            return node['items'][0]
+        return None
+    
+    def _fuzzy_best(self, query: str) -> Optional[Dict]:
+        """
+        Best fuzzy item-name match for the query (see NLPService.fuzzy_match_item)
+        Returns {'item': dict, 'confidence': 0-1} or None below SIMILARITY_THRESHOLD
+        """
+        items = self._items()
+        return self.nlp.fuzzy_match_item(
+            normalize_name(query), items, names_lower=self._normalized_names
+        )
+    
+    def _next_response(self, buffer: deque, population: Tuple[str, ...]) -> str:
+        """Pop a pre-drawn random reply, refilling the buffer in one batch"""
+        try:
+            return buffer.popleft()
+        except IndexError:
+            buffer.extend(self._choices(population, k=RESPONSE_BUFFER_SIZE))
+            return buffer.popleft()
+    
+    def _category_items(self, category: str) -> List[Dict]:
+        """Get the menu items of one category from the cached index"""
+        self._items()
+        return self._by_category.get(category.lower(), [])
+    
+    def handle_query(self, user_input: str) -> QueryResponse:
         """
         Main query handler with enhanced intent routing
         
         FIX 1: Separate handling for item_price_query vs price_range_query
         """
-        # Process input with NLP
+        # Process input with NLP (also gives the normalized, lowercased query)
         nlp_result = self.nlp.process_query(user_input)
+        query = nlp_result['original_query']
         intent = nlp_result['intent']
         entities = nlp_result['entities']
         confidence = nlp_result['confidence']
-        has_specific_item = nlp_result['has_specific_item']
         
         # Route to appropriate handler based on intent
-        handlers = {
-            'greeting': self._handle_greeting,
-            'menu_list': self._handle_menu_list,
-            'item_details': self._handle_item_details,
-            'item_price_query': self._handle_item_price_query,  # FIX 1: New handler
-            'price_range_query': self._handle_price_range_query,  # FIX 1: Renamed
-            'category_query': self._handle_category_query,
-            'restaurant_info': self._handle_restaurant_info,
-        }
-        
-        # FIX 1: Legacy 'price_query' intent support (map to appropriate handler)
-        if intent == 'price_query':
-            if has_specific_item:
-                handler = self._handle_item_price_query
-            else:
-                handler = self._handle_price_range_query
-        else:
-            handler = handlers.get(intent, self._handle_unknown)
-        
-        result = handler(user_input, entities)
+        # FIX 1: item_price_query and price_range_query have separate handlers
+        result = self._handler_table[intent](query, entities)
         
         # Add metadata
-        result['intent'] = intent
-        result['confidence'] = confidence
+        result.intent = INTENT_LABELS[intent]
+        result.confidence = confidence
         
         return result
     
-    def _handle_greeting(self, query: str, entities: Dict) -> Dict:
-        """Handle greeting intent"""
-        greetings = [
-            "Hello! Welcome to The Golden Spoon. How can I help you today?",
-            "Hi there! I'm DineBot, your virtual assistant. Ask me about our menu!",
-            "Greetings! Looking for something delicious? I can help you explore our menu.",
-        ]
-        
-        return {
-            'response': random.choice(greetings),
-            'suggestions': [
-                'Show me the menu',
-                'What are your timings?',
-                'Tell me about desserts'
-            ]
-        }
+    def _greeting_response(self, query: str, entities: Dict) -> QueryResponse:
+        """Canned greeting reply; the query and entities are not needed"""
+        return QueryResponse(
+            response=self._next_response(self._greeting_buf, GREETINGS),
+            suggestions=GREETING_SUGGESTIONS
+        )
     
-    def _handle_menu_list(self, query: str, entities: Dict) -> Dict:
+    def _handle_menu_list(self, query: str, entities: Dict) -> QueryResponse:
         """
         Handle menu listing with enhanced filtering
         
         FIX 2: Strict dietary filtering
         FIX 3: Correct price boundary application
         """
+        # Plain category/dietary listings come straight from the precomputed slices
+        if (entities.get(K_IS_VEGETARIAN) is not False
+                and not any(key in entities for key in MENU_EXTRA_FILTERS)):
+            self._items()
+            key = (
+                entities.get(K_CATEGORY, '').lower(),
+                entities.get(K_IS_VEGETARIAN) is True,
+                entities.get(K_IS_VEGAN) is True,
+            )
+            data = self._formatted_menu.get(key)
+            if data:
+                if K_CATEGORY in entities:
+                    response = f"Here are our {entities[K_CATEGORY].title()} items:"
+                else:
+                    response = "Here's our complete menu:"
+                if K_DIETARY_FILTER in entities:
+                    response += f" ({entities[K_DIETARY_FILTER].title()} options)"
+                return QueryResponse(
+                    response=response,
+                    data=data,
+                    count=len(data)
+                )
+        
         # Get all items or filter by category
-        if 'category' in entities:
-            items = self.db.get_items_by_category(entities['category'])
-            category_name = entities['category'].title()
+        if K_CATEGORY in entities:
+            items = self._category_items(entities[K_CATEGORY])
+            category_name = entities[K_CATEGORY].title()
             response = f"Here are our {category_name} items:"
         else:
-            items = self.db.get_all_items()
+            items = self._items()
             response = "Here's our complete menu:"
         
         # FIX 2: Apply strict dietary filters
@@ -99,46 +336,40 @@ class QueryService:
         items = self._apply_price_filters(items, entities)
         
         # Update response based on filters
-        if 'dietary_filter' in entities:
-            diet_type = entities['dietary_filter'].title()
+        if K_DIETARY_FILTER in entities:
+            diet_type = entities[K_DIETARY_FILTER].title()
             response += f" ({diet_type} options)"
         
-        if 'max_price' in entities or 'min_price' in entities:
+        if K_MAX_PRICE in entities or K_MIN_PRICE in entities:
             price_desc = self._get_price_filter_description(entities)
             response += f" {price_desc}"
         
         if not items:
             # FIX 4: Better fallback message with filter details
             filter_desc = self._describe_applied_filters(entities)
-            return {
-                'response': f"Sorry, I couldn't find any items matching your criteria{filter_desc}.",
-                'data': [],
-                'suggestions': [
-                    'Show me the full menu',
-                    'What vegetarian options do you have?',
-                    'Show me appetizers'
-                ]
-            }
+            return QueryResponse(
+                response=f"Sorry, I couldn't find any items matching your criteria{filter_desc}.",
+                data=[],
+                suggestions=NO_MENU_MATCH_SUGGESTIONS
+            )
         
-        return {
-            'response': response,
-            'data': self._format_menu_items(items),
-            'count': len(items)
-        }
+        return QueryResponse(
+            response=response,
+            data=self._format_menu_items(items),
+            count=len(items)
+        )
     
-    def _handle_item_price_query(self, query: str, entities: Dict) -> Dict:
+    def _handle_item_price_query(self, query: str, entities: Dict) -> QueryResponse:
         """
         FIX 1: Handle item-specific price queries
         
         Examples: "pizza cost", "how much is biryani", "price of chicken tikka"
         Returns: Specific item price, not range
         """
-        all_items = self.db.get_all_items()
-        
         # Try fuzzy matching with the full query
-        match_result = self.nlp.fuzzy_match_item(query, all_items)
+        match_result = self._fuzzy_best(query)
         
-        if match_result and match_result['confidence'] > 0.6:
+        if match_result and match_result['confidence'] > MATCH_CONFIDENCE_MIN:
             item = match_result['item']
             
             # Format response with item details
@@ -149,178 +380,188 @@ class QueryService:
                 f"📝 {item['description']}"
             )
             
-            return {
-                'response': response,
-                'data': {
+            return QueryResponse(
+                response=response,
+                data={
                     'name': item['name'],
                     'price': item['price'],
                     'category': item['category'],
                     'is_vegetarian': item['is_vegetarian'],
                     'is_vegan': item['is_vegan']
                 },
-                'matched_item': item['name'],
-                'match_confidence': match_result['confidence']
-            }
+                matched_item=item['name'],
+                match_confidence=match_result['confidence']
+            )
         
         # If no good match found, try searching by potential item names
-        if 'potential_items' in entities:
-            for potential_name in entities['potential_items']:
-                items = self.db.search_items(potential_name)
+        if K_POTENTIAL_ITEMS in entities:
+            # One batched search; use the first candidate that has matches
+            for items in self.db.search_items_batch(entities[K_POTENTIAL_ITEMS], limit=4):
                 if items:
                     if len(items) == 1:
                         item = items[0]
-                        return {
-                            'response': f"{item['name']} costs ₹{item['price']}.",
-                            'data': {
+                        return QueryResponse(
+                            response=f"{item['name']} costs ₹{item['price']}.",
+                            data={
                                 'name': item['name'],
                                 'price': item['price'],
                                 'category': item['category']
                             }
-                        }
+                        )
                     else:
                         # Multiple matches - ask for clarification
                         item_list = ', '.join([f"{item['name']} (₹{item['price']})" for item in items[:3]])
-                        return {
-                            'response': f"I found multiple items. Which one did you mean?\n{item_list}",
-                            'data': items[:3]
-                        }
+                        return QueryResponse(
+                            response=f"I found multiple items. Which one did you mean?\n{item_list}",
+                            data=items[:3]
+                        )
         
         # No match found - suggest alternatives
-        return {
-            'response': "I couldn't find that specific item. Could you try rephrasing? Or type 'show menu' to see all items.",
-            'suggestions': [
-                'Show me the menu',
-                'How much is pizza?',
-                'What are your prices?'
-            ]
-        }
+        return QueryResponse(
+            response="I couldn't find that specific item. Could you try rephrasing? Or type 'show menu' to see all items.",
+            suggestions=ITEM_PRICE_SUGGESTIONS
+        )
     
-    def _handle_price_range_query(self, query: str, entities: Dict) -> Dict:
+    def _handle_price_range_query(self, query: str, entities: Dict) -> QueryResponse:
         """
         FIX 1: Handle general price range queries (renamed from _handle_price_query)
         
         Examples: "menu prices", "price range", "how much for everything"
         Returns: Price range/statistics
         """
-        items = self.db.get_all_items()
-        
-        # Apply category filter if specified
-        if 'category' in entities:
-            items = self.db.get_items_by_category(entities['category'])
-        
-        # FIX 2: Apply dietary filters
-        items = self._apply_dietary_filters(items, entities)
-        
-        if not items:
-            filter_desc = self._describe_applied_filters(entities)
-            return {
-                'response': f"I couldn't find any items matching your criteria{filter_desc}.",
-                'suggestions': ['Show me the full menu']
-            }
+        # Refresh the derived caches once; both paths below read from them
+        items = self._items()
+        
+        # Precomputed statistics cover category + veg/vegan filters
+        stats = None
+        if entities.get(K_IS_VEGETARIAN) is not False and K_SPICE_LEVEL not in entities:
+            stats = self._price_stats.get((
+                entities.get(K_CATEGORY, '').lower(),
+                entities.get(K_IS_VEGETARIAN) is True,
+                entities.get(K_IS_VEGAN) is True,
+            ))
+        
+        if stats is None:
+            # Apply category filter if specified
+            if K_CATEGORY in entities:
+                items = self._by_category.get(entities[K_CATEGORY].lower(), [])
+            
+            # FIX 2: Apply dietary filters
+            items = self._apply_dietary_filters(items, entities)
+            
+            if not items:
+                filter_desc = self._describe_applied_filters(entities)
+                return QueryResponse(
+                    response=f"I couldn't find any items matching your criteria{filter_desc}.",
+                    suggestions=PRICE_RANGE_SUGGESTIONS
+                )
+            
+            # Calculate price statistics
+            prices = [item['price'] for item in items]
+            stats = (min(prices), max(prices), sum(prices) / len(prices), len(prices))
         
-        # Calculate price statistics
-        prices = [item['price'] for item in items]
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
+        min_price, max_price, avg_price, item_count = stats
         
-        category_text = f" for {entities['category']}" if 'category' in entities else ""
-        diet_text = f" ({entities['dietary_filter']})" if 'dietary_filter' in entities else ""
+        category_text = f" for {entities[K_CATEGORY]}" if K_CATEGORY in entities else ""
+        diet_text = f" ({entities[K_DIETARY_FILTER]})" if K_DIETARY_FILTER in entities else ""
         
         response = (
             f"💰 Our prices{category_text}{diet_text}:\n\n"
             f"• Lowest: ₹{min_price}\n"
             f"• Highest: ₹{max_price}\n"
             f"• Average: ₹{avg_price:.0f}\n\n"
-            f"Total items: {len(items)}"
+            f"Total items: {item_count}"
         )
         
-        return {
-            'response': response,
-            'data': {
+        return QueryResponse(
+            response=response,
+            data={
                 'min': min_price,
                 'max': max_price,
                 'average': round(avg_price, 2),
-                'count': len(items)
+                'count': item_count
             }
-        }
+        )
     
-    def _handle_item_details(self, query: str, entities: Dict) -> Dict:
+    def _handle_item_details(self, query: str, entities: Dict) -> QueryResponse:
         """Handle requests for specific item details"""
-        all_items = self.db.get_all_items()
-        
         # Check if query is a simple search (like "show chicken items")
         # This should return a list, not details
-        if re.search(r'\b(show|list|display).*\b(chicken|fish|meat|paneer|veg)\b', query.lower()):
+        if re.search(r'\b(show|list|display).*\b(chicken|fish|meat|paneer|veg)\b', query):
             # Treat as a filtered menu query
             keyword = None
-            if 'chicken' in query.lower():
+            if 'chicken' in query:
                 keyword = 'chicken'
-            elif 'fish' in query.lower():
+            elif 'fish' in query:
                 keyword = 'fish'
-            elif 'paneer' in query.lower():
+            elif 'paneer' in query:
                 keyword = 'paneer'
             
             if keyword:
                 items = self.db.search_items(keyword)
                 if items:
-                    return {
-                        'response': f"Here are items with {keyword}:",
-                        'data': self._format_menu_items(items),
-                        'count': len(items)
-                    }
-        
-        # Try fuzzy matching
-        match_result = self.nlp.fuzzy_match_item(query, all_items)
+                    return QueryResponse(
+                        response=f"Here are items with {keyword}:",
+                        data=self._format_menu_items(items),
+                        count=len(items)
+                    )
+        
+        # Try the name trie first (exact name or unambiguous prefix),
+        # then fall back to fuzzy matching
+        trie_item = self._trie_lookup(query)
+        if trie_item:
+            match_result = {'item': trie_item, 'confidence': 1.0}
+        else:
+            match_result = self._fuzzy_best(query)
         
-        if match_result and match_result['confidence'] > 0.6:
+        if match_result and match_result['confidence'] > MATCH_CONFIDENCE_MIN:
             item = match_result['item']
-            response = self._format_item_details(item)
+            response = self._item_details_text(item)
             
-            return {
-                'response': response,
-                'data': item,
-                'matched_item': item['name'],
-                'match_confidence': match_result['confidence']
-            }
+            return QueryResponse(
+                response=response,
+                data=item,
+                matched_item=item['name'],
+                match_confidence=match_result['confidence']
+            )
         
         # Try keyword search
-        if 'potential_items' in entities:
-            for potential_name in entities['potential_items']:
-                items = self.db.search_items(potential_name)
+        if K_POTENTIAL_ITEMS in entities:
+            # One batched search; use the first candidate that has matches
+            for items in self.db.search_items_batch(entities[K_POTENTIAL_ITEMS], limit=6):
                 if items:
                     if len(items) == 1:
                         item = items[0]
-                        response = self._format_item_details(item)
-                        return {
-                            'response': response,
-                            'data': item,
-                            'matched_item': item['name']
-                        }
+                        response = self._item_details_text(item)
+                        return QueryResponse(
+                            response=response,
+                            data=item,
+                            matched_item=item['name']
+                        )
                     else:
                         # Multiple matches found
                         item_names = [item['name'] for item in items[:5]]
-                        return {
-                            'response': f"I found multiple items. Did you mean: {', '.join(item_names)}?",
-                            'data': items[:5]
-                        }
+                        return QueryResponse(
+                            response=f"I found multiple items. Did you mean: {', '.join(item_names)}?",
+                            data=items[:5]
+                        )
         
         # No match found
-        return {
-            'response': "I couldn't find that item. Try asking about specific dishes like 'pizza' or 'chicken tikka', or type 'show menu'.",
-            'suggestions': ['Show menu', 'What are your appetizers?', 'Tell me about desserts']
-        }
+        return QueryResponse(
+            response="I couldn't find that item. Try asking about specific dishes like 'pizza' or 'chicken tikka', or type 'show menu'.",
+            suggestions=ITEM_DETAIL_SUGGESTIONS
+        )
     
-    def _handle_category_query(self, query: str, entities: Dict) -> Dict:
+    def _handle_category_query(self, query: str, entities: Dict) -> QueryResponse:
         """
         Handle category-specific queries with enhanced filtering
         
         FIX 2 & FIX 3: Apply dietary and price filters
         """
-        category = entities.get('category')
+        category = entities.get(K_CATEGORY)
         
         if category:
-            items = self.db.get_items_by_category(category)
+            items = self._category_items(category)
             
             # FIX 2: Apply dietary filters
             items = self._apply_dietary_filters(items, entities)
@@ -332,85 +573,44 @@ class QueryService:
                 response = f"Here are our {category.title()} items"
                 
                 # Add filter descriptions
-                if 'dietary_filter' in entities:
-                    response += f" ({entities['dietary_filter']})"
-                if 'max_price' in entities or 'min_price' in entities:
+                if K_DIETARY_FILTER in entities:
+                    response += f" ({entities[K_DIETARY_FILTER]})"
+                if K_MAX_PRICE in entities or K_MIN_PRICE in entities:
                     response += f" {self._get_price_filter_description(entities)}"
                 response += ":"
                 
-                return {
-                    'response': response,
-                    'data': self._format_menu_items(items),
-                    'count': len(items)
-                }
+                return QueryResponse(
+                    response=response,
+                    data=self._format_menu_items(items),
+                    count=len(items)
+                )
             else:
                 filter_desc = self._describe_applied_filters(entities)
-                return {
-                    'response': f"Sorry, I couldn't find any {category} items{filter_desc}.",
-                    'suggestions': [f'Show all {category}s', 'Show me the full menu']
-                }
-        
-        # Show all categories
-        categories = self.db.get_categories()
-        return {
-            'response': f"We have these categories: {', '.join(categories)}. Which would you like to explore?",
-            'data': {'categories': categories}
-        }
+                return QueryResponse(
+                    response=f"Sorry, I couldn't find any {category} items{filter_desc}.",
+                    suggestions=[f'Show all {category}s', 'Show me the full menu']
+                )
+        
+        # Show all categories (rendered with the menu cache)
+        self._items()
+        response, data = self._all_categories_response
+        return QueryResponse(response=response, data=data)
     
-    def _handle_restaurant_info(self, query: str, entities: Dict) -> Dict:
+    def _handle_restaurant_info(self, query: str, entities: Dict) -> QueryResponse:
         """Handle restaurant information queries"""
         info_type = self.nlp.extract_info_type(query)
-        restaurant = self.config.RESTAURANT_INFO
         
-        if info_type == 'hours':
-            hours = restaurant['opening_hours']
-            response = (
-                f"⏰ Opening Hours:\n"
-                f"Weekdays: {hours['weekday']}\n"
-                f"Weekends: {hours['weekend']}\n"
-                f"Closed on: {hours['closed']}"
-            )
-        
-        elif info_type == 'address':
-            response = (
-                f"📍 Location:\n{restaurant['name']}\n"
-                f"{restaurant['address']}"
-            )
-        
-        elif info_type == 'contact':
-            response = (
-                f"📞 Contact Us:\n"
-                f"Phone: {restaurant['phone']}\n"
-                f"Email: {restaurant['email']}"
-            )
-        
-        else:
-            # General info
-            response = (
-                f"🍽️ {restaurant['name']}\n"
-                f"📍 {restaurant['address']}\n"
-                f"📞 {restaurant['phone']}\n"
-                f"⏰ Open {restaurant['opening_hours']['weekday']} (Closed {restaurant['opening_hours']['closed']})\n"
-                f"🍴 Cuisines: {', '.join(restaurant['cuisine_types'])}\n"
-                f"💺 Seating: {restaurant['seating_capacity']} people\n"
-                f"✨ Facilities: {', '.join(restaurant['facilities'])}"
-            )
-        
-        return {
-            'response': response,
-            'data': restaurant
-        }
+        return QueryResponse(
+            response=self._info_strings.get(info_type, self._info_strings['general']),
+            data=self.config.RESTAURANT_INFO
+        )
     
-    def _handle_unknown(self, query: str, entities: Dict) -> Dict:
+    def _handle_unknown(self, query: str, entities: Dict) -> QueryResponse:
         """Handle unrecognized queries"""
-        return {
-            'response': random.choice(self.config.FALLBACK_RESPONSES),
-            'suggestions': [
-                'Show me the menu',
-                'What are your timings?',
-                'Tell me about your location'
-            ]
-        }
+        return QueryResponse(
+            response=self._next_response(self._fallback_buf, self._fallback_responses),
+            suggestions=UNKNOWN_SUGGESTIONS
+        )
     
     # ========== ENHANCED FILTERING METHODS ==========
     
@@ -423,27 +623,29 @@ class QueryService:
         - If 'is_vegan' == True, return ONLY vegan items
         - If 'is_vegetarian' == False, return ONLY non-vegetarian items
         - No mixed results
+        Dietary and spice predicates are applied in a single pass
         """
-        filtered_items = items
-        
-        # Vegan filter (most restrictive)
-        if entities.get('is_vegan') is True:
-            filtered_items = [item for item in filtered_items if item['is_vegan'] is True]
-        
-        # Vegetarian filter (if vegan not specified)
-        elif entities.get('is_vegetarian') is True:
-            filtered_items = [item for item in filtered_items if item['is_vegetarian'] is True]
-        
-        # Non-vegetarian filter
-        elif entities.get('is_vegetarian') is False:
-            filtered_items = [item for item in filtered_items if item['is_vegetarian'] is False]
+        # Vegan filter (most restrictive), then vegetarian / non-vegetarian
+        if entities.get(K_IS_VEGAN) is True:
+            diet_field, diet_value = 'is_vegan', True
+        elif entities.get(K_IS_VEGETARIAN) is True:
+            diet_field, diet_value = 'is_vegetarian', True
+        elif entities.get(K_IS_VEGETARIAN) is False:
+            diet_field, diet_value = 'is_vegetarian', False
+        else:
+            diet_field = diet_value = None
         
         # Spice level filter
-        if 'spice_level' in entities:
-            spice = entities['spice_level']
-            filtered_items = [item for item in filtered_items if item['spice_level'] == spice]
+        spice = entities.get(K_SPICE_LEVEL)
         
-        return filtered_items
+        if diet_field is None and spice is None:
+            return items
+        
+        return [
+            item for item in items
+            if (diet_field is None or item[diet_field] is diet_value)
+            and (spice is None or item['spice_level'] == spice)
+        ]
     
     def _apply_price_filters(self, items: List[Dict], entities: Dict) -> List[Dict]:
         """
@@ -458,9 +660,9 @@ class QueryService:
         filtered_items = items
         
         # Apply maximum price filter
-        if 'max_price' in entities:
-            max_price = entities['max_price']
-            is_inclusive = entities.get('max_inclusive', False)
+        if K_MAX_PRICE in entities:
+            max_price = entities[K_MAX_PRICE]
+            is_inclusive = entities.get(K_MAX_INCLUSIVE, False)
             
             if is_inclusive:
                 # "300 or less" → price <= 300
@@ -470,9 +672,9 @@ class QueryService:
                 filtered_items = [item for item in filtered_items if item['price'] <= max_price]
         
         # Apply minimum price filter
-        if 'min_price' in entities:
-            min_price = entities['min_price']
-            is_inclusive = entities.get('min_inclusive', True)
+        if K_MIN_PRICE in entities:
+            min_price = entities[K_MIN_PRICE]
+            is_inclusive = entities.get(K_MIN_INCLUSIVE, True)
             
             if is_inclusive:
                 # "200 or more" → price >= 200
@@ -482,8 +684,8 @@ class QueryService:
                 filtered_items = [item for item in filtered_items if item['price'] >= min_price]
         
         # Apply price preference (relative)
-        if 'price_preference' in entities:
-            pref = entities['price_preference']
+        if K_PRICE_PREFERENCE in entities:
+            pref = entities[K_PRICE_PREFERENCE]
             if filtered_items:
                 prices = [item['price'] for item in filtered_items]
                 median_price = sorted(prices)[len(prices) // 2]
@@ -499,16 +701,16 @@ class QueryService:
         """Generate human-readable price filter description"""
         parts = []
         
-        if 'max_price' in entities:
-            max_price = entities['max_price']
-            if entities.get('max_inclusive'):
+        if K_MAX_PRICE in entities:
+            max_price = entities[K_MAX_PRICE]
+            if entities.get(K_MAX_INCLUSIVE):
                 parts.append(f"₹{max_price} or less")
             else:
                 parts.append(f"under ₹{max_price + 1}")  # Display original value
         
-        if 'min_price' in entities:
-            min_price = entities['min_price']
-            if entities.get('min_inclusive'):
+        if K_MIN_PRICE in entities:
+            min_price = entities[K_MIN_PRICE]
+            if entities.get(K_MIN_INCLUSIVE):
                 parts.append(f"₹{min_price} or more")
             else:
                 parts.append(f"above ₹{min_price - 1}")  # Display original value
@@ -521,13 +723,13 @@ class QueryService:
         """Generate description of all applied filters for error messages"""
         filters = []
         
-        if 'category' in entities:
-            filters.append(entities['category'])
+        if K_CATEGORY in entities:
+            filters.append(entities[K_CATEGORY])
         
-        if 'dietary_filter' in entities:
-            filters.append(entities['dietary_filter'])
+        if K_DIETARY_FILTER in entities:
+            filters.append(entities[K_DIETARY_FILTER])
         
-        if 'max_price' in entities or 'min_price' in entities:
+        if K_MAX_PRICE in entities or K_MIN_PRICE in entities:
             price_desc = self._get_price_filter_description(entities)
             filters.append(price_desc)
         
@@ -539,18 +741,12 @@ class QueryService:
     
     def _format_menu_items(self, items: List[Dict]) -> List[Dict]:
         """Format menu items for display"""
-        formatted = []
-        for item in items:
-            formatted.append({
-                'name': item['name'],
-                'price': item['price'],
-                'category': item['category'],
-                'description': item['description'],
-                'vegetarian': item['is_vegetarian'],
-                'vegan': item['is_vegan'],
-                'spice_level': item['spice_level']
-            })
-        return formatted
+        return [
+            {'name': name, 'price': price, 'category': category, 'description': description,
+             'vegetarian': veg, 'vegan': vegan, 'spice_level': spice}
+            for name, price, category, description, veg, vegan, spice
+            in map(MENU_ITEM_FIELDS, items)
+        ]
     
     def _format_item_details(self, item: Dict) -> str:
         """Format detailed item information as text"""
@@ -558,21 +754,79 @@ class QueryService:
         vegan_tag = " | 🌱 Vegan" if item['is_vegan'] else ""
         spice_tag = f" | 🌶️ {item['spice_level'].title()}" if item['spice_level'] != 'none' else ""
         
-        response = (
-            f"🍽️ {item['name']} - ₹{item['price']}\n"
-            f"{veg_tag}{vegan_tag}{spice_tag}\n\n"
-            f"📝 {item['description']}\n\n"
-            f"🥘 Ingredients: {', '.join(item['ingredients'])}\n"
-            f"⏱️ Prep time: ~{item['preparation_time']} minutes"
-        )
-        
-        return response
+        return '\n'.join((
+            f"🍽️ {item['name']} - ₹{item['price']}",
+            f"{veg_tag}{vegan_tag}{spice_tag}",
+            '',
+            f"📝 {item['description']}",
+            '',
+            f"🥘 Ingredients: {', '.join(item['ingredients'])}",
+            f"⏱️ Prep time: ~{item['preparation_time']} minutes",
+        ))
+    
+    def _item_details_text(self, item: Dict) -> str:
+        """Pre-rendered details text for a menu item"""
+        text = self._item_detail_strings.get(item['name'])
+        if text is None:
+            text = self._format_item_details(item)
+        return text
+    
+    @staticmethod
+    def _render_info_strings(restaurant: Dict) -> Dict[str, str]:
+        """Render the restaurant info replies (hours, address, contact, general)"""
+        hours = restaurant['opening_hours']
+        return {
+            'hours': '\n'.join((
+                "⏰ Opening Hours:",
+                f"Weekdays: {hours['weekday']}",
+                f"Weekends: {hours['weekend']}",
+                f"Closed on: {hours['closed']}",
+            )),
+            'address': '\n'.join((
+                "📍 Location:",
+                restaurant['name'],
+                restaurant['address'],
+            )),
+            'contact': '\n'.join((
+                "📞 Contact Us:",
+                f"Phone: {restaurant['phone']}",
+                f"Email: {restaurant['email']}",
+            )),
+            'general': '\n'.join((
+                f"🍽️ {restaurant['name']}",
+                f"📍 {restaurant['address']}",
+                f"📞 {restaurant['phone']}",
+                f"⏰ Open {hours['weekday']} (Closed {hours['closed']})",
+                f"🍴 Cuisines: {', '.join(restaurant['cuisine_types'])}",
+                f"💺 Seating: {restaurant['seating_capacity']} people",
+                f"✨ Facilities: {', '.join(restaurant['facilities'])}",
+            )),
+        }
     
     # ========== PUBLIC API METHODS ==========
     
-    def get_menu_items(self) -> List[Dict]:
-        """Public method: Get all menu items"""
-        return self.db.get_all_items()
+    def get_menu_items(self, category: str = None, vegetarian: bool = False,
+                       vegan: bool = False) -> List[Dict]:
+        """Public method: Get menu items, optionally filtered"""
+        return self.db.filter_items(category, vegetarian, vegan)
+    
+    def get_menu_json(self, category: str = None, vegetarian: bool = False,
+                      vegan: bool = False) -> Tuple[bytes, str]:
+        """Public method: Get cached (JSON body, ETag) for a menu listing"""
+        self._items()  # Drops cached bodies if the menu changed
+        category_key = category.lower() if category else ''
+        if category_key and category_key not in self._by_category:
+            # Unknown categories all share one empty-result body, so arbitrary
+            # ?category= values can't grow the cache
+            category_key = None
+        key = (category_key, vegetarian, vegan)
+        cached = self._menu_json_cache.get(key)
+        if cached is None:
+            items = self.get_menu_items(category, vegetarian, vegan)
+            body = orjson.dumps({'items': items, 'count': len(items)})
+            cached = (body, hashlib.sha1(body).hexdigest())
+            self._menu_json_cache[key] = cached
+        return cached
     
     def get_item_details(self, item_name: str) -> Dict:
         """Public method: Get details of specific item"""